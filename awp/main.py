@@ -1,6 +1,6 @@
 import asyncio
 import json
-from typing import Awaitable, Callable, Dict, List, Literal
+from typing import Awaitable, Callable, Dict, List, Literal, Optional
 
 from rich.console import Console
 from tap import Tap
@@ -11,11 +11,20 @@ from awp.request import SIAKClient, SIAKException
 
 
 class ConsoleParser(Tap):
-    cmd: Literal["run", "schedule", "login"]
+    cmd: Literal["run", "schedule", "login", "simulate"]
     username: str = ""
     password: str = ""
     config: str = "config.yml"
     cookies: str = ""
+    stream: bool = False
+
+    # simulate
+    configs: List[str] = []
+    snapshots: List[str] = []
+    synthetic: int = 0
+    synthetic_load: float = 0.9
+    extra_classes: int = 2
+    seed: Optional[int] = None
 
 
 def fallback(
@@ -171,12 +180,35 @@ async def login(c: SIAKClient, args: ConsoleParser, console: Console):
     print(json.dumps(c.get_cookies()))
 
 
+def simulate(args: ConsoleParser, console: Console):
+    if not args.snapshots and not args.synthetic:
+        console.print("[red]Snapshots or synthetic snapshot count is required")
+        return
+
+    # numpy is only needed for simulation, avoid importing it on every run
+    try:
+        from awp.simulate import run_simulation
+    except ImportError:
+        console.print("[red]numpy is required for simulation, install the `simulate` extra (poetry install -E simulate)")
+        return
+
+    run_simulation(
+        args.configs or [args.config],
+        args.snapshots,
+        args.synthetic,
+        args.synthetic_load,
+        args.extra_classes,
+        args.seed,
+        console,
+    )
+
+
 def cli():
     console = Console()
     args = ConsoleParser().parse_args()
 
     async def wrapper(f: Callable[[SIAKClient, ConsoleParser, Console], Awaitable]):
-        c = SIAKClient(console)
+        c = SIAKClient(console, stream=args.stream)
         await f(c, args, console)
         await c.aclose()
 
@@ -186,6 +218,8 @@ def cli():
         asyncio.run(wrapper(main))
     elif args.cmd == "login":
         asyncio.run(wrapper(login))
+    elif args.cmd == "simulate":
+        simulate(args, console)
 
 
 if __name__ == "__main__":
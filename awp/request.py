@@ -1,10 +1,11 @@
 import asyncio
 import ssl
-from typing import TYPE_CHECKING, Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 from urllib.parse import urlparse
 
 import httpx
 from bs4 import BeautifulSoup, Tag
+from lxml import etree  # type: ignore
 from rich import inspect
 
 from awp.parser import IRSEdit, Schedule
@@ -77,20 +78,35 @@ class SIAKException(BaseException):
         self.soup = soup
 
 
-def is_valid_response(response: httpx.Response) -> tuple[bool, Optional[str]]:
-    try:
-        response_text = BeautifulSoup(response.text, "lxml").text.strip()
-    except:
-        response_text = response.text.strip()
+ERROR_MARKERS = {
+    "server SIAKNG sedang mengalami": "SIAK is down",
+    "SIAKNG saat ini tidak dapat diakses": "SIAK is down",
+    "The requested URL was rejected.": "Bot detection",
+    "This question is for testing whether you": "Bot detection",
+}
+_MARKER_BYTES = {k.encode(): v for k, v in ERROR_MARKERS.items()}
+_MARKER_OVERLAP = max(len(k) for k in _MARKER_BYTES) - 1
+
+ResponseCheck = Tuple[bool, Optional[str]]
+
+
+def _find_error_marker(text: str) -> Optional[str]:
+    for marker, reason in ERROR_MARKERS.items():
+        if marker in text:
+            return reason
+    return None
+
+
+def is_valid_response(response: httpx.Response, response_text: Optional[str] = None) -> ResponseCheck:
+    if response_text is None:
+        try:
+            response_text = BeautifulSoup(response.text, "lxml").text.strip()
+        except:
+            response_text = response.text.strip()
 
     if response.status_code == 200:
-        if "server SIAKNG sedang mengalami" in response_text or "SIAKNG saat ini tidak dapat diakses" in response_text:
-            return False, "SIAK is down"
-        elif (
-            "The requested URL was rejected." in response_text
-            or "This question is for testing whether you" in response_text
-        ):
-            return False, "Bot detection"
+        if reason := _find_error_marker(response_text):
+            return False, reason
         else:
             return True, None
     elif response.status_code == 302:
@@ -103,13 +119,56 @@ def is_valid_response(response: httpx.Response) -> tuple[bool, Optional[str]]:
         return False, f"Unexpected status code: {response.status_code}"
 
 
+async def read_streaming(response: httpx.Response) -> ResponseCheck:
+    """Read a streamed response while feeding it into an incremental HTML parser.
+
+    Error pages are detected as soon as their marker arrives, in which case the
+    response is closed without reading the rest of the body. Once the `tokens`
+    input is seen the page is known to be genuine and markers are no longer searched.
+    """
+    if response.status_code != 200:
+        await response.aread()
+        return is_valid_response(response)
+
+    parser = etree.HTMLPullParser(events=("start",), tag="input")
+    chunks: List[bytes] = []
+    tail = b""
+    has_token = False
+
+    async for chunk in response.aiter_bytes():
+        chunks.append(chunk)
+        parser.feed(chunk)
+        for _, element in parser.read_events():
+            has_token = has_token or element.get("name") == "tokens"
+
+        if has_token:
+            continue
+
+        window = tail + chunk
+        for marker, reason in _MARKER_BYTES.items():
+            if marker in window:
+                await response.aclose()
+                return False, reason
+        tail = window[-_MARKER_OVERLAP:]
+
+    # httpx does not keep bytes read through aiter_bytes, store them so .text keeps working
+    response._content = b"".join(chunks)
+    try:
+        root = parser.close()
+        response_text = "".join(root.itertext()).strip()
+    except etree.LxmlError:
+        response_text = response.text.strip()
+    return is_valid_response(response, response_text)
+
+
 class SIAKClient:
     DELAY = 5
     TIMEOUT = 5000
 
-    def __init__(self, console: "Console", debug: bool = False):
+    def __init__(self, console: "Console", debug: bool = False, stream: bool = False):
         self._console = console
         self._debug = debug
+        self._stream = stream
 
         self._ssl_context = httpx.create_ssl_context()
         self._ssl_context.set_ciphers("DEFAULT@SECLEVEL=0")
@@ -125,6 +184,18 @@ class SIAKClient:
             verify=self._ssl_context,
         )
 
+    async def _send(self, method: str, url: str, data: Optional[dict] = None) -> Tuple[httpx.Response, ResponseCheck]:
+        if not self._stream:
+            response = await self._client.request(method, url, data=data, headers=BASE_HEADERS)  # type: ignore
+            return response, is_valid_response(response)
+
+        request = self._client.build_request(method, url, data=data, headers=BASE_HEADERS)  # type: ignore
+        response = await self._client.send(request, stream=True)
+        try:
+            return response, await read_streaming(response)
+        finally:
+            await response.aclose()
+
     async def _request(
         self,
         method: str,
@@ -135,7 +206,7 @@ class SIAKClient:
         is_requesting = True
         response: httpx.Response
 
-        def _on_request_done(resp: asyncio.Task[httpx.Response]):
+        def _on_request_done(resp: asyncio.Task[Tuple[httpx.Response, ResponseCheck]]):
             nonlocal is_requesting
             nonlocal response
             try:
@@ -148,11 +219,11 @@ class SIAKClient:
                 print(e)
                 return
 
-            check, reason = is_valid_response(resp.result())
+            result, (check, reason) = resp.result()
             if check:
                 is_requesting = False
                 [fut.cancel() for fut in futures]
-                response = resp.result()
+                response = result
             else:
                 if self._debug:
                     self._console.log(reason)
@@ -165,7 +236,7 @@ class SIAKClient:
             if cookie.get("Mojavi") and cookie.get("siakng_cc"):
                 self.set_cookies(cookie)
 
-            task = asyncio.create_task(self._client.request(method, url, data=data, headers=BASE_HEADERS))  # type: ignore
+            task = asyncio.create_task(self._send(method, url, data))
             task.add_done_callback(_on_request_done)
             futures.append(task)
             await asyncio.sleep(self.DELAY)
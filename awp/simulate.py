@@ -0,0 +1,314 @@
+from typing import Dict, List, Literal, Optional, Sequence, Tuple
+
+import numpy as np
+import yaml
+from rich.console import Console
+from rich.table import Table
+
+from awp.config import Config, load_config
+from awp.parser import IRSEdit
+from awp.types import MaybeList, StrOrBytesPath
+
+try:
+    from yaml import CLoader as Loader
+except ImportError:
+    from yaml import Loader  # type: ignore
+
+Strategy = Literal["available", "lowest", "dontcare"]
+STRATEGIES: Tuple[Strategy, ...] = ("available", "lowest", "dontcare")
+
+# Maps an IRS subject key (c[CODE_CURRICULUM]) to (capacity, registrant) of every class
+Snapshot = Dict[str, List[Tuple[int, int]]]
+
+# Snapshots are evaluated in chunks to keep the (snapshot, subject, class) arrays small
+CHUNK_SIZE = 1024
+MAX_REGISTRANT = np.iinfo(np.int64).max
+
+
+def subject_key(code: str, curriculum: str) -> str:
+    return f"c[{code}_{curriculum}]"
+
+
+def snapshot_from_irs(irs: IRSEdit) -> Snapshot:
+    return {k: [(x.capacity, x.registrant) for x in v] for k, v in irs.classes_by_id.items()}
+
+
+def load_snapshots(path: StrOrBytesPath) -> List[Snapshot]:
+    """Load recorded snapshots, either a saved CoursePlanEdit page or a YAML/JSON file."""
+    with open(path, "r") as f:
+        content = f.read()
+
+    if str(path).endswith((".html", ".htm")):
+        return [snapshot_from_irs(IRSEdit.from_html(content))]
+
+    data: Optional[MaybeList[Snapshot]] = yaml.load(content, Loader)
+    if data is None:
+        return []
+    if not isinstance(data, list):
+        data = [data]
+    return [{k: [(int(c), int(r)) for c, r in v] for k, v in snap.items()} for snap in data]
+
+
+def pack_snapshots(snapshots: Sequence[Snapshot], keys: List[str]):
+    """Pack snapshots into (snapshot, subject, class) capacity, registrant and validity arrays."""
+    n_classes = max((len(v) for snap in snapshots for k, v in snap.items() if k in keys), default=0)
+    shape = (len(snapshots), len(keys), max(n_classes, 1))
+    capacity = np.zeros(shape, dtype=np.int64)
+    registrant = np.zeros(shape, dtype=np.int64)
+    valid = np.zeros(shape, dtype=bool)
+
+    for s, snap in enumerate(snapshots):
+        for u, key in enumerate(keys):
+            classes = snap.get(key)
+            if not classes:
+                continue
+
+            arr = np.asarray(classes, dtype=np.int64)
+            capacity[s, u, : len(arr)] = arr[:, 0]
+            registrant[s, u, : len(arr)] = arr[:, 1]
+            valid[s, u, : len(arr)] = True
+
+    return capacity, registrant, valid
+
+
+def synthetic_snapshots(
+    rng: np.random.Generator,
+    class_counts: np.ndarray,
+    count: int,
+    load: float,
+):
+    """Generate random snapshots, registrants are drawn around `load` times the capacity."""
+    shape = (count, len(class_counts), max(int(class_counts.max(initial=0)), 1))
+    capacity = rng.integers(20, 61, size=shape)
+    ratio = rng.normal(load, 0.25, size=shape)
+    registrant = np.clip(np.rint(capacity * ratio), 0, capacity).astype(np.int64)
+    valid = np.broadcast_to(np.arange(shape[2]) < class_counts[:, None], shape)
+    return capacity, registrant, valid
+
+
+def select_indices(
+    capacity: np.ndarray,
+    registrant: np.ndarray,
+    valid: np.ndarray,
+    subjects: np.ndarray,
+    preference: np.ndarray,
+    strategy: Strategy,
+) -> np.ndarray:
+    """Vectorized version of `select_classes` and `fallback`.
+
+    `capacity`, `registrant` and `valid` are (snapshot, subject, class) arrays,
+    `subjects` maps every selection to its subject and `preference` is a
+    (selection, preference) array padded with -1. Returns the chosen class index
+    for every snapshot and selection, or -1 when nothing can be chosen.
+    """
+    n_classes = capacity.shape[2]
+    in_range = (preference >= 0) & (preference < n_classes)
+    pref_idx = np.where(in_range, preference, 0)
+
+    pref_capacity = capacity[:, subjects[:, None], pref_idx]
+    pref_registrant = registrant[:, subjects[:, None], pref_idx]
+    pref_valid = in_range & valid[:, subjects[:, None], pref_idx]
+
+    if strategy == "dontcare":
+        candidate = pref_valid
+    else:
+        candidate = pref_valid & (pref_registrant < pref_capacity)
+
+    first = np.take_along_axis(np.broadcast_to(pref_idx, candidate.shape), candidate.argmax(axis=2)[..., None], axis=2)[..., 0]
+    chosen = np.where(candidate.any(axis=2), first, -1)
+
+    if strategy == "available":
+        # Falling back to every class does not depend on the preference, so it is done per subject
+        available = valid & (registrant < capacity)
+        lowest_available = np.where(available, registrant, MAX_REGISTRANT).argmin(axis=2)
+        lowest_all = np.where(valid, registrant, MAX_REGISTRANT).argmin(axis=2)
+        fallback = np.where(available.any(axis=2), lowest_available, lowest_all)
+        fallback = np.where(valid.any(axis=2), fallback, -1)[:, subjects]
+    else:
+        lowest = np.where(pref_valid, pref_registrant, MAX_REGISTRANT).argmin(axis=2)
+        fallback = np.take_along_axis(np.broadcast_to(pref_idx, candidate.shape), lowest[..., None], axis=2)[..., 0]
+        fallback = np.where(pref_valid.any(axis=2), fallback, -1)
+
+    return np.where(chosen >= 0, chosen, fallback)
+
+
+def is_success(capacity: np.ndarray, registrant: np.ndarray, subjects: np.ndarray, selected: np.ndarray) -> np.ndarray:
+    snapshot_idx = np.arange(capacity.shape[0])[:, None]
+    class_idx = np.maximum(selected, 0)
+    cap = capacity[snapshot_idx, subjects, class_idx]
+    reg = registrant[snapshot_idx, subjects, class_idx]
+    return (selected >= 0) & (reg < cap)
+
+
+def simulate(
+    configs: Sequence[Config],
+    snapshots: Sequence[Snapshot],
+    synthetic: int = 0,
+    load: float = 0.9,
+    extra_classes: int = 2,
+    seed: Optional[int] = None,
+    console: Optional[Console] = None,
+) -> Dict[Strategy, Tuple[np.ndarray, np.ndarray]]:
+    """Evaluate every strategy for every config against every snapshot.
+
+    Returns per strategy a pair of (config,) arrays: the rate of subjects that got a
+    class with a free seat, and the rate of snapshots where every subject got one.
+    Selections the real bot would crash on are warned about through `console`.
+    """
+    # Accounts usually share selections, so only distinct (subject, preference) pairs are evaluated
+    unique: Dict[Tuple[str, Tuple[int, ...]], int] = {}
+    subject_map: List[int] = []
+    sizes: List[int] = []
+    for cfg in configs:
+        for sel in cfg["selections"]:
+            # select_classes would index from the end of the class list, which cannot be padded with -1
+            if any(i < 0 for i in sel["preference"]):
+                raise ValueError(f"Negative preference in {sel['name']}, use the class index from the start instead.")
+
+            pair = (subject_key(sel["code"], sel["curriculum"]), tuple(sel["preference"]))
+            subject_map.append(unique.setdefault(pair, len(unique)))
+        sizes.append(len(cfg["selections"]))
+
+    keys = sorted({key for key, _ in unique})
+    key_pos = {key: u for u, key in enumerate(keys)}
+    key_idx = np.array([key_pos[key] for key, _ in unique], dtype=np.intp)
+    max_pref = max((len(pref) for _, pref in unique), default=0)
+    preference = np.full((len(unique), max(max_pref, 1)), -1, dtype=np.int64)
+    for (_, pref), j in unique.items():
+        preference[j, : len(pref)] = pref
+
+    capacity, registrant, valid = pack_snapshots(snapshots, keys)
+    if snapshots and console is not None:
+        _warn_invalid_selections(valid, keys, list(unique), console)
+
+    if synthetic:
+        class_counts = np.zeros(len(keys), dtype=np.int64)
+        np.maximum.at(class_counts, key_idx, preference.max(axis=1) + 1 + extra_classes)
+        arrays = synthetic_snapshots(np.random.default_rng(seed), class_counts, synthetic, load)
+        n_classes = max(capacity.shape[2], arrays[0].shape[2])
+        capacity, registrant, valid = (
+            np.concatenate([_pad_classes(a, n_classes), _pad_classes(b, n_classes)])
+            for a, b in zip((capacity, registrant, valid), arrays)
+        )
+
+    n_snapshots = capacity.shape[0]
+    if not n_snapshots:
+        raise ValueError("No snapshots to simulate with.")
+
+    subject_map_arr = np.array(subject_map, dtype=np.intp)
+    sizes_arr = np.array(sizes, dtype=np.int64)
+    nonempty = sizes_arr > 0
+    offsets = (np.cumsum(sizes_arr) - sizes_arr)[nonempty]
+
+    result: Dict[Strategy, Tuple[np.ndarray, np.ndarray]] = {}
+    for strategy in STRATEGIES:
+        subject_hits = np.zeros(len(configs), dtype=np.int64)
+        all_hits = np.zeros(len(configs), dtype=np.int64)
+        for start in range(0, n_snapshots if len(offsets) else 0, CHUNK_SIZE):
+            chunk = slice(start, start + CHUNK_SIZE)
+            cap, reg = capacity[chunk], registrant[chunk]
+            selected = select_indices(cap, reg, valid[chunk], key_idx, preference, strategy)
+            success = is_success(cap, reg, key_idx, selected)[:, subject_map_arr].astype(np.int64)
+
+            per_config = np.add.reduceat(success, offsets, axis=1)
+            subject_hits[nonempty] += per_config.sum(axis=0)
+            all_hits[nonempty] += (per_config == sizes_arr[nonempty]).sum(axis=0)
+
+        subject_rate = np.full(len(configs), np.nan)
+        all_rate = np.full(len(configs), np.nan)
+        subject_rate[nonempty] = subject_hits[nonempty] / (sizes_arr[nonempty] * n_snapshots)
+        all_rate[nonempty] = all_hits[nonempty] / n_snapshots
+        result[strategy] = (subject_rate, all_rate)
+    return result
+
+
+def _warn_invalid_selections(
+    valid: np.ndarray,
+    keys: List[str],
+    selections: List[Tuple[str, Tuple[int, ...]]],
+    console: Console,
+):
+    # The bot raises KeyError/IndexError on these, the simulator would only count them as failures
+    class_counts = valid.sum(axis=2)
+    present = class_counts > 0
+    min_counts = np.where(present, class_counts, np.iinfo(np.int64).max).min(axis=0)
+    for missing in np.flatnonzero(~present.any(axis=0)):
+        console.log(f"[yellow]Subject [cyan]{keys[missing]}[/cyan] is not in any recorded snapshot, check its code and curriculum")
+
+    key_pos = {key: u for u, key in enumerate(keys)}
+    for key, pref in selections:
+        u = key_pos[key]
+        out_of_range = [i for i in pref if present[:, u].any() and i >= min_counts[u]]
+        if out_of_range:
+            console.log(
+                f"[yellow]Preference {out_of_range} of [cyan]{key}[/cyan] does not exist,"
+                + f" some recorded snapshots only have {min_counts[u]} classes"
+            )
+
+
+def _pad_classes(arr: np.ndarray, n_classes: int) -> np.ndarray:
+    pad = [(0, 0), (0, 0), (0, n_classes - arr.shape[2])]
+    return np.pad(arr, pad)
+
+
+def print_report(
+    names: List[str],
+    configs: Sequence[Config],
+    result: Dict[Strategy, Tuple[np.ndarray, np.ndarray]],
+    console: Console,
+):
+    table = Table(caption="subject success rate (all subjects success rate)")
+    table.add_column("Config")
+    for strategy in STRATEGIES:
+        table.add_column(strategy, justify="right")
+
+    for i, (name, cfg) in enumerate(zip(names, configs)):
+        if not cfg["selections"]:
+            table.add_row(name, *["-"] * len(STRATEGIES))
+            continue
+
+        cells = []
+        for strategy in STRATEGIES:
+            subject_rate, all_rate = result[strategy]
+            cell = f"{subject_rate[i]:.1%} ({all_rate[i]:.1%})"
+            if strategy == cfg["fallback"]:
+                cell = f"[bold]{cell}[/bold]"
+            cells.append(cell)
+        table.add_row(name, *cells)
+
+    weights = np.array([len(cfg["selections"]) for cfg in configs], dtype=np.float64)
+    mask = weights > 0
+    if len(configs) > 1 and mask.any():
+        cells = []
+        for strategy in STRATEGIES:
+            subject_rate, all_rate = result[strategy]
+            subject_mean = np.average(subject_rate[mask], weights=weights[mask])
+            cells.append(f"{subject_mean:.1%} ({all_rate[mask].mean():.1%})")
+        table.add_section()
+        table.add_row("[bold]Overall", *cells)
+
+    console.print(table)
+
+
+def run_simulation(
+    config_paths: List[str],
+    snapshot_paths: List[str],
+    synthetic: int,
+    load: float,
+    extra_classes: int,
+    seed: Optional[int],
+    console: Console,
+):
+    with console.status("Loading configs and snapshots..."):
+        configs = [load_config(path) for path in config_paths]
+        snapshots = [snap for path in snapshot_paths for snap in load_snapshots(path)]
+
+    console.log(f"Simulating {len(configs)} configs against {len(snapshots) + synthetic} snapshots")
+    try:
+        with console.status("Simulating..."):
+            result = simulate(configs, snapshots, synthetic, load, extra_classes, seed, console)
+    except ValueError as e:
+        console.print(f"[red]{e}")
+        return
+
+    print_report(config_paths, configs, result, console)
@@ -0,0 +1,98 @@
+import asyncio
+import gzip
+import time
+from typing import Dict, List
+
+import pytest
+from rich.console import Console
+
+from awp.request import SIAKClient
+
+CHUNK_DELAY = 0.05
+
+IRS_PAGE = (
+    b"<html><body><div class='box'><table>"
+    + b"<tr class='x'><td><input name='c[A_1]' value='1-4'></td><td>Kelas A</td><td></td><td>40</td><td>10</td></tr>" * 50
+    + b"</table></div><input name='tokens' value='tok123'>"
+    + b"<p>filler</p>" * 500
+    + b"</body></html>"
+)
+BOT_PAGE = b"<html><body><p>The requested URL was rejected. Please consult</p>" + b"<p>filler</p>" * 2000 + b"</body></html>"
+DOWN_PAGE = b"<html><body><p>Mohon maaf, server SIAKNG sedang mengalami gangguan</p>" + b"<p>filler</p>" * 2000 + b"</body></html>"
+
+
+def split_chunks(body: bytes, size: int = 2048) -> List[bytes]:
+    return [body[start:][:size] for start in range(0, len(body), size)]
+
+
+def split_on_marker(body: bytes, marker: bytes) -> List[bytes]:
+    middle = body.index(marker) + len(marker) // 2
+    return [body[:middle]] + split_chunks(body[middle:])
+
+
+ROUTES: Dict[str, List[bytes]] = {
+    "/irs": split_chunks(IRS_PAGE),
+    "/irs-gzip": split_chunks(gzip.compress(IRS_PAGE), 256),
+    "/bot": split_chunks(BOT_PAGE),
+    "/down": split_chunks(DOWN_PAGE),
+    "/bot-split": split_on_marker(BOT_PAGE, b"The requested URL was rejected."),
+    "/down-split": split_on_marker(DOWN_PAGE, b"server SIAKNG sedang mengalami"),
+}
+
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    path = (await reader.readline()).split()[1].decode()
+    while (await reader.readline()) not in (b"\r\n", b""):
+        pass
+
+    chunks = ROUTES[path]
+    encoding = b"Content-Encoding: gzip\r\n" if path.endswith("gzip") else b""
+    length = sum(len(x) for x in chunks)
+    writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n" + encoding + b"Content-Length: %d\r\n\r\n" % length)
+    try:
+        for chunk in chunks:
+            writer.write(chunk)
+            await writer.drain()
+            await asyncio.sleep(CHUNK_DELAY)
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def fetch(path: str, stream: bool):
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    client = SIAKClient(Console(quiet=True), stream=stream)
+    try:
+        start = time.monotonic()
+        response, check = await client._send("GET", f"http://127.0.0.1:{port}{path}")
+        return response, check, time.monotonic() - start
+    finally:
+        await client.aclose()
+        server.close()
+        await server.wait_closed()
+
+
+@pytest.mark.parametrize(
+    "path,reason",
+    [
+        ("/bot", "Bot detection"),
+        ("/down", "SIAK is down"),
+        ("/bot-split", "Bot detection"),
+        ("/down-split", "SIAK is down"),
+    ],
+)
+def test_stream_stops_on_error_page(path, reason):
+    _, check, elapsed = asyncio.run(fetch(path, stream=True))
+    assert check == (False, reason)
+    assert elapsed < len(ROUTES[path]) * CHUNK_DELAY / 2
+
+
+@pytest.mark.parametrize("path", ["/irs", "/irs-gzip"])
+def test_stream_reads_same_text(path):
+    streamed, check, _ = asyncio.run(fetch(path, stream=True))
+    plain, plain_check, _ = asyncio.run(fetch(path, stream=False))
+    assert check == plain_check == (True, None)
+    # .text relies on the body being stored back on the response after streaming
+    assert streamed.text == plain.text == IRS_PAGE.decode()
@@ -0,0 +1,81 @@
+import io
+import random
+from typing import List
+
+import pytest
+from rich.console import Console
+
+from awp.main import select_classes
+from awp.parser import IRSClass, IRSEdit
+
+np = pytest.importorskip("numpy")
+from awp.simulate import STRATEGIES, load_snapshots, pack_snapshots, select_indices, simulate, subject_key  # noqa: E402
+
+
+def random_case(rng: random.Random):
+    selections = []
+    snapshot = {}
+    classes: List[IRSClass] = []
+    for i in range(rng.randint(1, 4)):
+        code = f"CS{i}"
+        key = subject_key(code, "01")
+        snapshot[key] = [(rng.randint(1, 4), rng.randint(0, 5)) for _ in range(rng.randint(1, 5))]
+        classes.extend(IRSClass(key, str(j), f"{code}-{j}", c, r) for j, (c, r) in enumerate(snapshot[key]))
+
+        n_classes = len(snapshot[key])
+        preference = rng.sample(range(n_classes), rng.randint(1, n_classes))
+        selections.append({"code": code, "curriculum": "01", "name": code, "preference": preference})
+
+    return selections, snapshot, IRSEdit("tokens", classes)
+
+
+@pytest.mark.parametrize("strategy", STRATEGIES)
+def test_simulate_matches_select_classes(strategy):
+    rng = random.Random(strategy)
+    console = Console(file=io.StringIO())
+
+    for _ in range(300):
+        selections, snapshot, irs = random_case(rng)
+        cfg = {"username": "", "password": "", "fallback": strategy, "selections": selections, "default": {}}
+
+        selected = select_classes(cfg, console, irs)  # type: ignore
+        expected = [selected[x["name"]].registrant < selected[x["name"]].capacity for x in selections]
+
+        keys = [subject_key(x["code"], x["curriculum"]) for x in selections]
+        preference = np.full((len(selections), 5), -1)
+        for i, x in enumerate(selections):
+            preference[i, : len(x["preference"])] = x["preference"]
+
+        capacity, registrant, valid = pack_snapshots([snapshot], keys)
+        indices = select_indices(capacity, registrant, valid, np.arange(len(keys)), preference, strategy)
+        assert indices[0].tolist() == [int(selected[x["name"]].class_id) for x in selections]
+
+        subject_rate, all_rate = simulate([cfg], [snapshot])[strategy]  # type: ignore
+        assert subject_rate[0] == pytest.approx(np.mean(expected))
+        assert all_rate[0] == all(expected)
+
+
+def test_simulate_batches_configs():
+    rng = random.Random(0)
+    cases = [random_case(rng) for _ in range(50)]
+    configs = [{"fallback": "available", "selections": selections} for selections, _, _ in cases]
+    snapshots = [snapshot for _, snapshot, _ in cases]
+
+    result = simulate(configs, snapshots)  # type: ignore
+    for i, cfg in enumerate(configs):
+        single = simulate([cfg], snapshots)  # type: ignore
+        for strategy in STRATEGIES:
+            assert result[strategy][0][i] == pytest.approx(single[strategy][0][0])
+            assert result[strategy][1][i] == pytest.approx(single[strategy][1][0])
+
+
+def test_load_snapshots_empty_file(tmp_path):
+    path = tmp_path / "empty.yaml"
+    path.write_text("# nothing recorded yet\n")
+    assert load_snapshots(path) == []
+
+
+def test_simulate_rejects_negative_preference():
+    cfg = {"fallback": "lowest", "selections": [{"code": "CS0", "curriculum": "01", "name": "CS0", "preference": [-1]}]}
+    with pytest.raises(ValueError, match="CS0"):
+        simulate([cfg], [{subject_key("CS0", "01"): [(40, 10)]}])  # type: ignore